@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
+import logging
 import subprocess
 import sys
 import os
 
+logger = logging.getLogger(__name__)
+
 # Test what the exact command would be
 test_message = "hello"
 command = f'claude -p -c "{test_message}" --output-format json'
@@ -32,6 +35,4 @@ except subprocess.TimeoutExpired:
     print("Try running the command directly in terminal first to verify:")
     print(f"  {command}")
 except Exception as e:
-    print(f"❌ Command failed with error: {e}")
-    import traceback
-    traceback.print_exc()
\ No newline at end of file
+    logger.exception("❌ Command failed with error: %s", e)
\ No newline at end of file
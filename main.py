@@ -2,21 +2,26 @@
 """
 Main entry point for Telegram CLI Controller for Claude
 """
-import sys
-import os
 import logging
-
-# Set up logging before importing other modules
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-# Add src to path so we can import modules
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+import os
 
 from src.app import main
 
 if __name__ == "__main__":
     import asyncio
+
+    # Only configure logging when run as a script, so importing this module
+    # (e.g. during test collection) leaves the root logger alone
+    logging.basicConfig(
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    # Prefer uvloop's faster event loop when it is installed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     asyncio.run(main())
\ No newline at end of file
@@ -2,9 +2,18 @@ import asyncio
 import logging
 import os
 import sys
-import subprocess
-import json
+import re
+import signal
 from pathlib import Path
+from typing import Callable, Optional
+
+# orjson parses stream-json lines noticeably faster when it is installed
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+_loads = _json.loads
 
 # Add src to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
@@ -14,8 +23,217 @@ from telegram_bridge import TelegramBridge
 
 logger = logging.getLogger(__name__)
 
+# Largest stream-json line accepted from Claude; tool results can be far
+# bigger than asyncio's 64 KiB default
+STREAM_LINE_LIMIT = 16 * 1024 * 1024
+
+# Claude writes "type" as the first key, so most records can be skipped by
+# peeking at it instead of parsing the whole line
+_TYPE_RE = re.compile(rb'\{\s*"type"\s*:\s*"([a-z_]+)"')
+
+# Tools Claude may use without asking for permission
+ALLOWED_TOOLS = 'Task,TaskOutput,Bash,Glob,Grep,ExitPlanMode,Read,Edit,Write,NotebookEdit,WebFetch,TodoWrite,WebSearch,TaskStop,AskUserQuestion,Skill,EnterPlanMode,EnterWorktree'
+
+# Arguments shared by every Claude invocation, after the prompt
+_CLAUDE_TAIL = ('--output-format', 'stream-json', '--verbose', '--allowedTools', ALLOWED_TOOLS)
+
+# Environment for Claude, built once instead of copying os.environ per message
+_CLAUDE_ENV = {
+    **os.environ,
+    'TERM': 'dumb',
+    'PYTHONIOENCODING': 'utf-8',
+    # Ensure no interactive behavior for Claude CLI
+    'CLAUDE_NO_INTERACTIVE': '1',
+    # Set locale to avoid encoding issues
+    'LANG': 'C.UTF-8',
+    'LC_ALL': 'C.UTF-8',
+}
+
+# Prompt sent for /compact
+COMPACT_PROMPT = "Summarize all previous conversation and provide a concise overview of what has been done."
+
+def _new_session_command(message: str) -> list:
+    """Build a command that starts a new session (no -c) with the message."""
+    if not message:
+        raise ValueError("Please provide a message after /new_session")
+    return ['claude', '-p', message, *_CLAUDE_TAIL]
+
+def _compact_command(_message: str) -> list:
+    """Build a command that asks Claude to summarize the conversation so far."""
+    # Builders share one signature; /compact ignores any text after it
+    return ['claude', '-p', '-c', COMPACT_PROMPT, *_CLAUDE_TAIL]
+
+def _continue_command(text: str) -> list:
+    """Build a command that continues the current session with the text."""
+    # Run exactly as per AGENTS.md specifications:
+    # claude -p -c "MESSAGE" --output-format stream-json
+    return ['claude', '-p', '-c', text, *_CLAUDE_TAIL]
+
+# Telegram commands mapped to the builder for their Claude command line;
+# any other text continues the session
+_COMMANDS = {
+    '/new_session': _new_session_command,
+    '/compact': _compact_command,
+}
+
+def _content_text(response_data: dict) -> Optional[str]:
+    """Return the first text or tool_result item of a message record, formatted for Telegram."""
+    # The CLI nests the API message under "message"; fall back to a flat record
+    message = response_data.get('message')
+    if not isinstance(message, dict):
+        message = response_data
+    content = message.get('content', [])
+    if not content or not isinstance(content, list):
+        return None
+
+    for item in content:
+        if not isinstance(item, dict):
+            continue
+        if item.get('type') == 'text':
+            text_content = item.get('text', '')
+            if text_content:
+                return text_content
+        elif item.get('type') == 'tool_result':
+            # Display tool name and input wrapped in backticks
+            tool_name = item.get('tool_call_id', 'Unknown Tool')
+            input_content = item.get('input', '')
+            if input_content:
+                return f"Tool: {tool_name}\nInput: ```{input_content}```\n"
+    return None
+
+def _result_text(response_data: dict) -> Optional[str]:
+    """Return the final answer carried by a result record."""
+    result = response_data.get('result')
+    return result if isinstance(result, str) else None
+
+# Stream-json record types forwarded to Telegram, mapped to the function that
+# turns a record into the text to send; everything else (tool_use, system)
+# is dropped
+_TYPE_HANDLERS = {
+    'message': _content_text,
+    'user': _content_text,
+    'assistant': _content_text,
+    'result': _result_text,
+}
+
+async def forward_claude_output(stdout: asyncio.StreamReader, send_message: Callable):
+    """Read Claude's stream-json output and send the readable parts with send_message."""
+    # Whether assistant text has been sent; the result record repeats the
+    # final answer, so it is only sent when nothing else got through
+    answered = False
+
+    # Process output line by line
+    while True:
+        raw = await stdout.readline()
+        if not raw:
+            break
+
+        # Per-line logging is debug-only; skip decoding the line unless it is shown
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing line from command: %s", raw.decode('utf-8', 'replace').rstrip())
+
+        # Lines stay bytes; JSON records go to the parser as read, trailing
+        # newline included, and only other output is decoded
+        if raw[:1] != b'{':
+            # Not JSON - send directly as text
+            text_line = raw.decode('utf-8', 'replace').strip()
+            if text_line:
+                await send_message(text_line)
+            continue
+
+        try:
+            # Skip records we would throw away without parsing them
+            match = _TYPE_RE.match(raw)
+            if match and match.group(1).decode('ascii') not in _TYPE_HANDLERS:
+                continue
+
+            response_data = _loads(raw)
+            response_type = response_data.get('type', 'unknown')
+            logger.debug("Processing JSON line: type=%s", response_type)
+
+            handler = _TYPE_HANDLERS.get(response_type)
+            if handler is None:
+                continue
+
+            if response_type == 'result' and answered:
+                continue
+
+            message = handler(response_data)
+            if message:
+                # Send immediately as it's received
+                await send_message(message)
+                # Any text from Claude counts, flat "message" records included;
+                # user records only echo tool results back
+                if handler is _content_text and response_type != 'user':
+                    answered = True
+        except ValueError as e:
+            # Both json and orjson raise ValueError subclasses on bad input
+            logger.warning("Failed to parse line as JSON: %s", e)
+            # If we can't parse a line, send as-is (for non-JSON output)
+            # Send immediately as it's received
+            await send_message(raw.decode('utf-8', 'replace').strip())
+        except Exception as e:
+            logger.error("Error processing response: %s", e)
+            # Continue processing other messages
+            continue
+
+def use_pidfd_child_watcher():
+    """Reap Claude subprocesses through pidfds instead of a thread per child (Linux only)."""
+    # Python 3.12+ deprecates child watchers and picks pidfds by itself
+    if sys.platform != 'linux' or sys.version_info >= (3, 12) or not hasattr(asyncio, 'PidfdChildWatcher'):
+        return
+
+    # Alternative loops such as uvloop reap children themselves
+    policy = asyncio.get_event_loop_policy()
+    if not hasattr(policy, 'set_child_watcher'):
+        return
+
+    # pidfd_open needs Linux 5.3+
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except (AttributeError, OSError):
+        return
+
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(asyncio.get_running_loop())
+    policy.set_child_watcher(watcher)
+    logger.info("Using pidfd child watcher for Claude subprocesses")
+
+def kill_process_group(p: asyncio.subprocess.Process):
+    """Kill a process started with start_new_session, along with its children."""
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(p.pid, signal.SIGKILL)
+        else:
+            p.kill()
+    except ProcessLookupError:
+        pass
+
+def stop_on_signals() -> asyncio.Event:
+    """Return an event that is set when the process receives SIGINT or SIGTERM."""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGINT, signal.SIGTERM)
+
+    def stop():
+        stop_event.set()
+        # Restore the default handlers so a second Ctrl+C can interrupt a
+        # shutdown that hangs
+        for sig in signals:
+            loop.remove_signal_handler(sig)
+
+    for sig in signals:
+        try:
+            loop.add_signal_handler(sig, stop)
+        except NotImplementedError:
+            # Windows event loops don't support signal handlers
+            pass
+    return stop_event
+
 async def main():
     """Main application entry point - single-shot execution mode."""
+    use_pidfd_child_watcher()
+
     # Load configuration
     try:
         config = load_config()
@@ -23,166 +241,99 @@ async def main():
         print(f"Configuration error: {e}")
         sys.exit(1)
 
-    # Set up logging
-    logging.basicConfig(level=logging.INFO)
-
     # Create Telegram bridge
     telegram_bridge = TelegramBridge(
         bot_token=config.telegram_bot_token,
         chat_id=config.telegram_chat_id,
         max_chunk=config.tg_max_chunk,
         send_interval_ms=config.tg_send_interval_ms,
-        forward_prefix=config.forward_prefix
+        forward_prefix=config.forward_prefix,
+        allowed_user_ids=config.allowed_user_ids
     )
 
     # Set up message handler to execute single-shot clang commands
     async def handle_telegram_message(text: str):
-        logger.info(f"Received Telegram message: {text}")
+        logger.info("Received Telegram message: %s", text)
         logger.info("Preparing to execute Claude command...")
 
-        # Check if this is a /new_session command
-        if text.startswith('/new_session'):
-            # Extract the message part after /new_session
-            message = text[len('/new_session'):].strip()
-            if not message:
-                await telegram_bridge.send_message("Error: Please provide a message after /new_session")
-                return
-
-            # Run command without -c option for new session
-            command = ['claude', '-p', message, '--output-format', 'stream-json', '--verbose', '--allowedTools', 'Task,TaskOutput,Bash,Glob,Grep,ExitPlanMode,Read,Edit,Write,NotebookEdit,WebFetch,TodoWrite,WebSearch,TaskStop,AskUserQuestion,Skill,EnterPlanMode,EnterWorktree']
-        # Check if this is a /compact command
-        elif text.startswith('/compact'):
-            # Send a summary request to Claude
-            message = "Summarize all previous conversation and provide a concise overview of what has been done."
-            command = ['claude', '-p', '-c', message, '--output-format', 'stream-json', '--verbose', '--allowedTools', 'Task,TaskOutput,Bash,Glob,Grep,ExitPlanMode,Read,Edit,Write,NotebookEdit,WebFetch,TodoWrite,WebSearch,TaskStop,AskUserQuestion,Skill,EnterPlanMode,EnterWorktree']
-        else:
-            # Run exactly as per AGENTS.md specifications:
-            # claude -p -c "MESSAGE" --output-format stream-json
-            command = ['claude', '-p', '-c', text, '--output-format', 'stream-json', '--verbose', '--allowedTools', 'Task,TaskOutput,Bash,Glob,Grep,ExitPlanMode,Read,Edit,Write,NotebookEdit,WebFetch,TodoWrite,WebSearch,TaskStop,AskUserQuestion,Skill,EnterPlanMode,EnterWorktree']
+        # Look the first word up in the command table
+        words = text.split(maxsplit=1)
+        builder = _COMMANDS.get(words[0]) if words else None
+        try:
+            command = builder(words[1] if len(words) > 1 else '') if builder else _continue_command(text)
+        except ValueError as e:
+            await telegram_bridge.send_message(f"Error: {e}")
+            await telegram_bridge.flush()
+            return
 
-        logger.info(f"Command to execute: {' '.join(command)}")
-        
-        # Set environment to prevent interactive behavior
-        env = os.environ.copy()
-        env['TERM'] = 'dumb'
-        env['PYTHONIOENCODING'] = 'utf-8'
-        # Ensure no interactive behavior for Claude CLI
-        env['CLAUDE_NO_INTERACTIVE'] = '1'
-        # Set locale to avoid encoding issues
-        env['LANG'] = 'C.UTF-8'
-        env['LC_ALL'] = 'C.UTF-8'
+        logger.info("Command to execute: %s", ' '.join(command))
         
+        p = None
+        stderr_task = None
+
         # Execute the command with proper timeout and environment
         try:
-            # Use Popen for line-by-line processing  
-            p = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # Line buffered
-                env=env,
-                cwd=os.getcwd()
+            # Run as an asyncio subprocess so the event loop, and with it the
+            # send queue, keeps running while Claude works. Polling still waits
+            # for this handler, so commands are handled one at a time
+            p = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=_CLAUDE_ENV,
+                cwd=os.getcwd(),
+                limit=STREAM_LINE_LIMIT,
+                # Own process group, so the tools Claude starts can be killed with it
+                start_new_session=True
             )
             
-            logger.info(f"Command executed with PID: {p.pid}")
+            logger.info("Command executed with PID: %s", p.pid)
+
+            # Drain stderr alongside stdout so a chatty CLI can't fill the pipe and stall
+            stderr_task = asyncio.create_task(p.stderr.read())
             
             # Process output line by line
-            for line in p.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Log the line being processed (this will show in logs)
-                logger.info(f"Processing line from command: {line}.")
-
-                # Send all lines to Telegram for display - this ensures intermediate messages are shown
-                await telegram_bridge.send_message(line)
-
-                try:
-                    # Handle possible invalid JSON or malformed data gracefully
-                    if not line.startswith('{'):
-                        # Not JSON - send directly as text
-                        continue
-
-                    response_data = json.loads(line)
-                    logger.info(f"Processing JSON line: type={response_data.get('type', 'unknown')}")
-
-                    response_type = response_data.get('type', 'unknown')
-
-                    # Only process message, user, and assistant types to filter out tool_use and tool_result
-                    if response_type not in ['message', 'user', 'assistant']:
-                        continue
-
-                    # Handle different response types
-                    if response_type == 'result':
-                        # Result type is final signal - command completed
-                        logger.info("Received result type - command completed")
-                        # Send any final result if available
-                        result_value = response_data.get('result', '')
-                        if result_value:
-                            await telegram_bridge.send_message(result_value)
-                        break  # Stop processing after result
-
-                    elif response_type in ['message', 'user', 'assistant']:
-                        # Message type - extract text content
-                        content = response_data.get('content', [])
-                        if content and isinstance(content, list):
-                            for item in content:
-                                if isinstance(item, dict):
-                                    if item.get('type') == 'text':
-                                        text_content = item.get('text', '')
-                                        if text_content:
-                                            # Send immediately as it's received
-                                            await telegram_bridge.send_message(text_content)
-                                            break
-                                    elif item.get('type') == 'tool_result':
-                                        # Handle tool_result content - display tool name and input wrapped in backticks
-                                        tool_name = item.get('tool_call_id', 'Unknown Tool')
-                                        input_content = item.get('input', '')
-                                        if input_content:
-                                            # Format tool call with backticks
-                                            formatted_content = f"Tool: {tool_name}\nInput: ```{input_content}```\n"
-                                            await telegram_bridge.send_message(formatted_content)
-                                            break
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse line as JSON: {e}")
-                    # If we can't parse a line, send as-is (for non-JSON output)
-                    if line.strip():
-                        # Send immediately as it's received
-                        await telegram_bridge.send_message(line.strip())
-                except Exception as e:
-                    logger.error(f"Error processing response: {e}")
-                    # Continue processing other messages
-                    continue
-                        
-            # Force flush of any remaining output
-            p.stdout.flush()
-            
+            await forward_claude_output(p.stdout, telegram_bridge.send_message)
+
             # Wait for process to complete and get return code
-            p.wait()
-            logger.info(f"Command executed with return code: {p.returncode}")
+            await p.wait()
+            logger.info("Command executed with return code: %s", p.returncode)
             
             # Handle stderr output
-            if p.stderr is not None:
-                stderr_output = p.stderr.read().strip()
-                if stderr_output:
-                    logger.warning(f"Command stderr output: {stderr_output}")
-                    # Send stderr output to Telegram for display with clear formatting
-                    await telegram_bridge.send_message(f"STDERR: {stderr_output}")
+            stderr_output = (await stderr_task).decode('utf-8', 'replace').strip()
+            if stderr_output:
+                logger.warning("Command stderr output: %s", stderr_output)
+                # Send stderr output to Telegram for display with clear formatting
+                await telegram_bridge.send_message(f"STDERR: {stderr_output}")
                     
-        except subprocess.TimeoutExpired:
-            logger.error("Command timed out")
-            await telegram_bridge.send_message("Command timed out (environment limitation)")
         except Exception as e:
-            logger.error(f"Error executing command: {e}")
+            logger.error("Error executing command: %s", e)
             await telegram_bridge.send_message(f"Error: {str(e)}")
+        finally:
+            # On errors or cancellation Claude would otherwise be left blocked on
+            # a pipe nobody reads
+            if p is not None and p.returncode is None:
+                kill_process_group(p)
+                await p.wait()
+            if stderr_task is not None and not stderr_task.done():
+                stderr_task.cancel()
+            # Close the batch so the next command's replies never share a message
+            # with this one's
+            await telegram_bridge.flush()
 
     telegram_bridge.set_message_handler(handle_telegram_message)
 
     # Start Telegram polling
     logger.info("Starting Telegram polling...")
-    await telegram_bridge.start_polling()
+    try:
+        await telegram_bridge.start_polling(stop_on_signals())
+    finally:
+        await telegram_bridge.close()
 
 if __name__ == "__main__":
+    # Only configure logging when run directly; main.py sets it up otherwise
+    logging.basicConfig(
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     asyncio.run(main())
\ No newline at end of file
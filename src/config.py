@@ -1,17 +1,35 @@
 import os
+from dataclasses import dataclass
 from typing import Optional, Union
 
+@dataclass(frozen=True)
 class Config:
-    def __init__(self):
-        self.telegram_bot_token: str = os.environ.get('TELEGRAM_BOT_CC_TOKEN', '')
-        self.telegram_chat_id: int = int(os.environ.get('TELEGRAM_CHAT_ID', 0))
-        self.tg_max_chunk: int = int(os.environ.get('TG_MAX_CHUNK', 3500))
-        self.tg_send_interval_ms: int = int(os.environ.get('TG_SEND_INTERVAL_MS', 800))
-        self.forward_prefix: Optional[str] = os.environ.get('FORWARD_PREFIX', None)
+    telegram_bot_token: str = ''
+    telegram_chat_id: int = 0
+    tg_max_chunk: int = 3500
+    tg_send_interval_ms: int = 800
+    forward_prefix: Optional[str] = None
+    # Parsed once so authorization is a set lookup on the integer user ID
+    allowed_user_ids: frozenset = frozenset()
+
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Build a Config from environment variables in a single pass."""
+        env = os.environ
+        return cls(
+            telegram_bot_token=env.get('TELEGRAM_BOT_CC_TOKEN', ''),
+            telegram_chat_id=int(env.get('TELEGRAM_CHAT_ID') or 0),
+            tg_max_chunk=int(env.get('TG_MAX_CHUNK', 3500)),
+            tg_send_interval_ms=int(env.get('TG_SEND_INTERVAL_MS', 800)),
+            forward_prefix=env.get('FORWARD_PREFIX'),
+            allowed_user_ids=frozenset(
+                int(user_id) for user_id in env.get('ALLOWED_USER_IDS', '').split(',') if user_id.strip()
+            ),
+        )
 
 def load_config() -> Config:
     """Load configuration from environment variables."""
-    config = Config()
+    config = Config.from_env()
     
     # Validate required variables
     if not config.telegram_bot_token:
@@ -1,105 +1,254 @@
 import asyncio
+import json
 import time
 import logging
-from typing import Optional, Callable, Set
-from collections import deque
+from typing import Optional, Callable, Set, Tuple
 
 import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# Seconds Telegram holds a getUpdates request open while waiting for new updates
+POLL_TIMEOUT = 50
+
+# Messages waiting to be sent before send_message starts waiting for the sender
+SEND_QUEUE_SIZE = 256
+
+# Longest wait in seconds between retries while polling keeps failing
+MAX_POLL_BACKOFF = 30.0
+
+# Only 'message' updates are handled, so don't ask Telegram for anything else
+ALLOWED_UPDATES = json.dumps(['message'])
+
+# Characters escaped for MarkdownV2, mapped in one translate pass
+_MDV2_TABLE = str.maketrans({c: '\\' + c for c in '.-()_#!={}><'})
+
 def escape_only_dots(text: str) -> str:
     """Escape only '.' for Telegram MarkdownV2 ('.' -> '\\.')."""
-    return text.replace(".", r"\.").replace("-", r"\-").replace("(", r"\(").replace(")", r"\)").replace("_", r"\_").replace("#", r"\#").replace("!", r"\!").replace("=", r"\=").replace("{", r"\{").replace("}", r"\}").replace(">", r"\>").replace("<", r"\<")
+    return text.translate(_MDV2_TABLE)
 
 class TelegramBridge:
     def __init__(self, bot_token: str, chat_id: int, max_chunk: int = 3500,
-                 send_interval_ms: int = 800, forward_prefix: Optional[str] = None):
+                 send_interval_ms: int = 800, forward_prefix: Optional[str] = None,
+                 allowed_user_ids: Optional[frozenset] = None):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.max_chunk = max_chunk
         self.send_interval_ms = send_interval_ms
         self.forward_prefix = forward_prefix
+        # Empty means every user in the chat may send commands
+        self.allowed_user_ids: frozenset = frozenset(allowed_user_ids or ())
 
-        # Buffer for outgoing messages
-        self._outgoing_buffer: deque = deque()
-        self._last_send_time = 0.0
+        # Bounded queue of outgoing messages, drained in batches by _flush_loop.
+        # It and the flush primitives are created on first send so they belong
+        # to the running event loop
+        self._outgoing_buffer: Optional[asyncio.Queue] = None
+        self._buffered_chars = 0
+        # Monotonic time before which the next chunk may not be sent
+        self._next_send = 0.0
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
 
         # For handling incoming messages
         self._message_handler: Optional[Callable] = None
+        # Offset just past the last fully handled update, so a stop in the
+        # middle of a batch can still confirm the updates before it
+        self._handled_offset = 0
 
         # Rate limiting
         self._send_interval_seconds = send_interval_ms / 1000.0
 
+        # Built once; _send_chunk only fills in the text
+        self._send_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        self._payload_template = {'chat_id': chat_id, 'parse_mode': 'MarkdownV2'}
+
+        # Shared HTTP session so connections to Telegram are kept alive between requests
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300, keepalive_timeout=75)
+            )
+        return self._session
+
+    async def close(self):
+        """Send anything still buffered, then close the shared HTTP session."""
+        if self._flush_task is not None:
+            await self.flush()
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
     async def send_message(self, text: str):
-        """Send a message to Telegram chat."""
-        if not text:
+        """Queue a message for the Telegram chat; the flush loop sends it."""
+        # Telegram rejects blank messages, so don't spend a request on them
+        if not text or text.isspace():
             return
 
-        # Chunk the message if needed
-        chunks = self._chunk_text(text)
+        if self._outgoing_buffer is None:
+            self._outgoing_buffer = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+            self._flush_event = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        # Only waits when the sender has fallen a full queue behind
+        await self._outgoing_buffer.put(text)
+        self._buffered_chars += len(text)
+        self._flush_event.set()
 
-        for chunk in chunks:
-            # Rate limiting
-            now = time.time()
-            time_since_last = now - self._last_send_time
-            if time_since_last < self._send_interval_seconds:
-                await asyncio.sleep(self._send_interval_seconds - time_since_last)
+    async def _flush_loop(self):
+        """Send buffered messages, batching whatever arrives while the rate limit holds us back."""
+        while True:
+            await self._flush_event.wait()
 
-            # Send the chunk
-            await self._send_chunk(chunk)
-            self._last_send_time = time.time()
+            # Let more messages join the batch until the rate limit would allow
+            # the next send anyway, unless a full message is already waiting
+            delay = self._next_send - time.monotonic()
+            if delay > 0 and self._buffered_chars < self.max_chunk:
+                await asyncio.sleep(delay)
+
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error flushing messages to Telegram: %s", e)
+
+    async def flush(self):
+        """Send everything buffered, packing consecutive small messages into one."""
+        if self._outgoing_buffer is None:
+            return
+
+        async with self._flush_lock:
+            batch = []
+            batch_chars = 0
+            while not self._outgoing_buffer.empty():
+                text = self._outgoing_buffer.get_nowait()
+                self._buffered_chars -= len(text)
+
+                # Oversized messages keep their own chunk boundaries
+                if len(text) > self.max_chunk:
+                    if batch:
+                        await self._send_batch(batch)
+                        batch, batch_chars = [], 0
+                    for chunk in self._chunk_text(text):
+                        await self._send_batch([chunk])
+                    continue
+
+                if batch and batch_chars + 1 + len(text) > self.max_chunk:
+                    await self._send_batch(batch)
+                    batch, batch_chars = [], 0
+
+                batch_chars += len(text) + (1 if batch else 0)
+                batch.append(text)
+
+            if batch:
+                await self._send_batch(batch)
+
+    async def _send_batch(self, batch: list):
+        """Send messages joined into one chunk, handling the ways Telegram can refuse it."""
+        status, body = await self._send_rate_limited('\n'.join(batch))
+        if status == 200:
+            return
+
+        if status == 400 and "can't parse entities" in body.get('description', ''):
+            # One message with stray MarkdownV2 syntax must not take the rest
+            # of the batch down with it
+            if len(batch) > 1:
+                for text in batch:
+                    await self._send_rate_limited(text)
+            return
+
+        if status == 429 or status >= 500:
+            # Throttled or a Telegram-side error: wait as told, then retry the
+            # whole batch once rather than multiplying requests
+            retry_after = body.get('parameters', {}).get('retry_after', 0)
+            self._next_send = max(self._next_send, time.monotonic() + retry_after)
+            await self._send_rate_limited('\n'.join(batch))
+
+        # Anything else, including network errors where the message may have
+        # arrived anyway, is dropped rather than risking duplicates
+
+    async def _send_rate_limited(self, chunk: str) -> Tuple[int, dict]:
+        """Send a chunk, waiting out the minimum interval since the previous send."""
+        delay = self._next_send - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        result = await self._send_chunk(chunk)
+        self._next_send = time.monotonic() + self._send_interval_seconds
+        return result
 
     def _chunk_text(self, text: str) -> list:
         """Split text into chunks that don't exceed max_chunk size."""
-        if len(text) <= self.max_chunk:
+        length = len(text)
+        if length <= self.max_chunk:
             return [text]
 
+        # Walk an index through the text so only the chunks themselves are copied
         chunks = []
-        while text:
-            if len(text) <= self.max_chunk:
-                chunks.append(text)
-                break
+        pos = 0
+        while pos < length:
+            end = min(pos + self.max_chunk, length)
 
-            # Find a good split point
-            chunk = text[:self.max_chunk]
+            # Try to split at a line break, then fall back to a word boundary
+            if end < length:
+                split_at = text.rfind('\n', pos, end)
+                if split_at <= pos:
+                    split_at = text.rfind(' ', pos, end)
+                if split_at > pos:
+                    end = split_at
 
-            # Try to split at word boundary
-            last_space = chunk.rfind(' ')
-            if last_space > 0:
-                chunk = chunk[:last_space]
+            chunks.append(text[pos:end])
 
-            chunks.append(chunk)
-            text = text[len(chunk):].lstrip()
+            # Skip the whitespace the next chunk would otherwise start with
+            pos = end
+            while pos < length and text[pos].isspace():
+                pos += 1
 
         return chunks
 
-    async def _send_chunk(self, chunk: str):
-        """Send a single chunk to Telegram."""
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+    async def _send_chunk(self, chunk: str) -> Tuple[int, dict]:
+        """Send a single chunk to Telegram.
+
+        Returns the HTTP status (0 if no response arrived) and the decoded
+        response body.
+        """
         # Apply MarkdownV2 escaping to the chunk
-        escaped_chunk = escape_only_dots(chunk)
-        data = {
-            'chat_id': self.chat_id,
-            'text': escaped_chunk,
-            'parse_mode': 'MarkdownV2'
-        }
+        data = {**self._payload_template, 'text': escape_only_dots(chunk)}
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data) as response:
-                    if response.status != 200:
-                        # Log error but don't raise - we don't want to break the flow
-                        error_text = await response.text()
-                        logger.error(f"Failed to send message to Telegram: {response.status} - {error_text}")
+            session = await self._get_session()
+            async with session.post(self._send_url, json=data) as response:
+                if response.status == 200:
+                    return response.status, {}
+
+                # Log error but don't raise - we don't want to break the flow
+                error_text = await response.text()
+                logger.error("Failed to send message to Telegram: %s - %s", response.status, error_text)
+                try:
+                    body = json.loads(error_text)
+                except ValueError:
+                    body = {}
+                return response.status, body if isinstance(body, dict) else {}
         except Exception as e:
             # Log error but don't raise - we don't want to break the flow
-            logger.error(f"Error sending message to Telegram: {e}")
+            logger.error("Error sending message to Telegram: %s", e)
+            return 0, {}
 
     def set_message_handler(self, handler: Callable):
         """Set the handler for incoming Telegram messages."""
         self._message_handler = handler
 
+    def is_authorized(self, user_id: Optional[int]) -> bool:
+        """Check whether a user may send commands to the bot."""
+        return not self.allowed_user_ids or user_id in self.allowed_user_ids
+
     async def handle_incoming_message(self, message_data: dict):
         """Handle an incoming Telegram message."""
         if not self._message_handler:
@@ -120,6 +269,9 @@ class TelegramBridge:
         if chat['id'] != self.chat_id:
             return
 
+        if not self.is_authorized(message.get('from', {}).get('id')):
+            return
+
         if 'text' not in message:
             return
 
@@ -132,64 +284,105 @@ class TelegramBridge:
         try:
             await self._message_handler(text)
         except Exception as e:
-            logger.error(f"Error in message handler: {e}")
+            logger.error("Error in message handler: %s", e)
             # Continue polling even if one message fails
 
     async def poll_telegram_updates(self, offset: int = 0):
-        """Poll for Telegram updates - this would be called in a loop."""
+        """Poll for Telegram updates - this would be called in a loop.
+
+        Network and API errors are raised so the caller can back off.
+        """
         url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
         params = {
             'offset': offset,
-            'timeout': 30
+            'timeout': POLL_TIMEOUT,
+            'allowed_updates': ALLOWED_UPDATES
         }
+        # Give the HTTP layer some slack so it never gives up before Telegram answers
+        timeout = aiohttp.ClientTimeout(total=POLL_TIMEOUT + 5)
 
+        session = await self._get_session()
+        async with session.get(url, params=params, timeout=timeout) as response:
+            if response.status == 200:
+                data = await response.json()
+                if 'result' in data:
+                    # Process all messages in the batch
+                    for update in data['result']:
+                        # Process each update
+                        await self.handle_incoming_message(update)
+                        update_id = update.get('update_id')
+                        if isinstance(update_id, int):
+                            self._handled_offset = max(self._handled_offset, update_id + 1)
+                    
+                    # Return the next offset for the next poll
+                    if data['result']:
+                        try:
+                            update_ids = [update.get('update_id', 0) for update in data['result'] if 'update_id' in update]
+                            if update_ids:
+                                next_offset = max(update_ids) + 1
+                                return next_offset
+                        except (ValueError, TypeError):
+                            # If we can't compute max, return current offset
+                            logger.warning("Could not compute next offset from update IDs, keeping current offset")
+                            pass
+                    # Fallback: if there were updates but couldn't get max, increment offset
+                    # If there were no updates, return current offset
+                    return offset + 1 if data['result'] else offset
+                else:
+                    # No 'result' key in response - return current offset
+                    return offset
+            else:
+                logger.error("Telegram API error: %s", response.status)
+                response.raise_for_status()
+                return offset
+
+    async def _confirm_offset(self, offset: int):
+        """Tell Telegram that every update before offset has been handled."""
+        url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
+        params = {'offset': offset, 'timeout': 0, 'limit': 1}
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'result' in data:
-                            # Process all messages in the batch
-                            for update in data['result']:
-                                # Process each update
-                                await self.handle_incoming_message(update)
-                            
-                            # Return the next offset for the next poll
-                            if data['result']:
-                                try:
-                                    update_ids = [update.get('update_id', 0) for update in data['result'] if 'update_id' in update]
-                                    if update_ids:
-                                        next_offset = max(update_ids) + 1
-                                        return next_offset
-                                except (ValueError, TypeError):
-                                    # If we can't compute max, return current offset
-                                    logger.warning("Could not compute next offset from update IDs, keeping current offset")
-                                    pass
-                            # Fallback: if there were updates but couldn't get max, increment offset
-                            # If there were no updates, return current offset
-                            return offset + 1 if data['result'] else offset
-                        else:
-                            # No 'result' key in response - return current offset
-                            return offset
-                    else:
-                        logger.error(f"Telegram API error: {response.status}")
-                        return offset  # Return current offset on error
+            session = await self._get_session()
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                response.raise_for_status()
         except Exception as e:
-            logger.error(f"Error polling Telegram updates: {e}")
-            # Return current offset on error to prevent stopping polling
-            return offset
+            logger.error("Failed to confirm Telegram updates up to %s: %s", offset, e)
+
+    async def start_polling(self, stop_event: Optional[asyncio.Event] = None):
+        """Start polling for Telegram messages until stop_event is set."""
+        if stop_event is None:
+            stop_event = asyncio.Event()
+        stop_task = asyncio.ensure_future(stop_event.wait())
 
-    async def start_polling(self):
-        """Start polling for Telegram messages."""
         offset = 0
-        while True:
-            try:
-                offset = await self.poll_telegram_updates(offset)
-                await asyncio.sleep(0.5)  # Poll every 500ms
-            except Exception as e:
-                logger.error(f"Error in Telegram polling loop: {e}")
-                await asyncio.sleep(1)  # Wait before retrying
-                # Do not reset offset on error, continue with current offset
-            # Ensure we don't get stuck if offset becomes None
-            if offset is None:
-                offset = 0
\ No newline at end of file
+        backoff = 0.0
+        try:
+            while not stop_event.is_set():
+                # Race each long poll against the stop event so shutdown doesn't
+                # wait for Telegram to answer
+                poll_task = asyncio.ensure_future(self.poll_telegram_updates(offset))
+                await asyncio.wait({poll_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not poll_task.done():
+                    poll_task.cancel()
+                    await asyncio.wait({poll_task})
+                    # Updates handled before the stop would otherwise be
+                    # delivered, and their prompts run, again on restart
+                    if self._handled_offset > offset:
+                        await self._confirm_offset(self._handled_offset)
+                    break
+
+                try:
+                    # getUpdates long-polls, so the next request can go out right away
+                    offset = poll_task.result()
+                    backoff = 0.0
+                except Exception as e:
+                    logger.error("Error in Telegram polling loop: %s", e)
+                    # Back off exponentially while Telegram or the network is failing
+                    backoff = min(MAX_POLL_BACKOFF, backoff * 2 or 1.0)
+                    await asyncio.wait({stop_task}, timeout=backoff)
+                    # Do not reset offset on error, continue with current offset
+                # Ensure we don't get stuck if offset becomes None
+                if offset is None:
+                    offset = 0
+        finally:
+            stop_task.cancel()
+        logger.info("Telegram polling stopped")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Run one or more prompts through a single Claude CLI process and print the results
+"""
+import asyncio
+import json
+import os
+import sys
+
+# Seconds a single prompt may run before the process is killed
+TIMEOUT = 600
+
+# Largest stream-json line accepted from Claude; tool results can be far
+# bigger than asyncio's 64 KiB default
+STREAM_LINE_LIMIT = 16 * 1024 * 1024
+
+# Environment and command are shared by every invocation
+_ENV = os.environ | {'TERM': 'dumb', 'PYTHONIOENCODING': 'utf-8'}
+_COMMAND = ('claude', '-p', '-c', '--input-format', 'stream-json',
+            '--output-format', 'stream-json', '--verbose')
+
+class ClaudeWorker:
+    """A long-lived Claude CLI process that is fed prompts over stdin."""
+
+    def __init__(self):
+        self._proc = None
+        # Only one prompt may be in flight on the pipe at a time
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Spawn the Claude CLI process."""
+        self._proc = await asyncio.create_subprocess_exec(
+            *_COMMAND,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            # Nothing reads stderr while a prompt runs, so a pipe could fill and stall the CLI
+            stderr=asyncio.subprocess.DEVNULL,
+            env=_ENV,
+            limit=STREAM_LINE_LIMIT
+        )
+
+    async def send(self, text: str):
+        """Send one prompt and yield its JSON records, ending with the result record."""
+        async with self._lock:
+            message = {'type': 'user', 'message': {'role': 'user', 'content': text}}
+            self._proc.stdin.write(json.dumps(message).encode('utf-8') + b'\n')
+            await self._proc.stdin.drain()
+
+            async for raw in self._proc.stdout:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    # Pass through anything the CLI prints that is not JSON
+                    yield {'type': 'raw', 'text': raw.decode('utf-8', 'replace')}
+                    continue
+                yield record
+                if record.get('type') == 'result':
+                    return
+
+            # stdout closed before the prompt finished - the process has died
+            await self._proc.wait()
+            yield {'type': 'error', 'returncode': self._proc.returncode}
+
+    async def close(self):
+        """Close stdin so the CLI exits, killing it if it does not."""
+        if self._proc is None or self._proc.returncode is not None:
+            return
+        self._proc.stdin.close()
+        try:
+            await asyncio.wait_for(self._proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            self._proc.kill()
+            await self._proc.wait()
+
+async def run_claude_batch(prompts: list):
+    """Run every prompt through one Claude CLI process, paying its startup cost once."""
+    worker = ClaudeWorker()
+    await worker.start()
+
+    async def consume(index: int, text: str):
+        async for record in worker.send(text):
+            print(f"[{index}] {record}")
+
+    try:
+        for index, text in enumerate(prompts):
+            try:
+                await asyncio.wait_for(consume(index, text), timeout=TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"[{index}] Timed out after {TIMEOUT} seconds")
+                # The pipe is mid-response, so the process can't be reused
+                break
+    finally:
+        await worker.close()
+
+if __name__ == "__main__":
+    prompts = sys.argv[1:] or ["test"]
+    asyncio.run(run_claude_batch(prompts))
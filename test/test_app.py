@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for forwarding Claude's stream-json output
+"""
+import asyncio
+import json
+import sys
+import os
+
+# Make the repository root importable so src is a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.app import forward_claude_output
+
+async def _forward(lines: list) -> list:
+    """Feed lines through forward_claude_output as Claude's stdout and return what it sends."""
+    stdout = asyncio.StreamReader()
+    stdout.feed_data(b''.join(line.encode('utf-8') + b'\n' for line in lines))
+    stdout.feed_eof()
+
+    sent = []
+
+    async def send_message(text):
+        sent.append(text)
+
+    await forward_claude_output(stdout, send_message)
+    return sent
+
+def test_forward_claude_output_sends_assistant_text():
+    """Text nested under "message" in real stream-json records reaches the chat."""
+    lines = [
+        json.dumps({'type': 'system', 'subtype': 'init', 'session_id': 's1'}),
+        'plain text line',
+        json.dumps({
+            'type': 'assistant',
+            'message': {
+                'id': 'msg_1', 'type': 'message', 'role': 'assistant',
+                'content': [{'type': 'text', 'text': 'Hello there'}],
+            },
+            'session_id': 's1',
+        }),
+        json.dumps({'type': 'tool_use', 'name': 'Bash'}),
+    ]
+    assert asyncio.run(_forward(lines)) == ['plain text line', 'Hello there']
+
+def test_forward_claude_output_sends_result_only_without_assistant_text():
+    """The result record is a fallback: sent when no assistant text was, never twice."""
+    assistant = json.dumps({
+        'type': 'assistant',
+        'message': {'role': 'assistant', 'content': [{'type': 'text', 'text': 'The answer'}]},
+    })
+    result = json.dumps({'type': 'result', 'subtype': 'success', 'result': 'The answer'})
+
+    assert asyncio.run(_forward([assistant, result])) == ['The answer']
+    assert asyncio.run(_forward([result])) == ['The answer']
+
+    flat = json.dumps({'type': 'message', 'role': 'assistant', 'content': [{'type': 'text', 'text': 'Answer'}]})
+    flat_result = json.dumps({'type': 'result', 'subtype': 'success', 'result': 'Answer'})
+    assert asyncio.run(_forward([flat, flat_result])) == ['Answer']
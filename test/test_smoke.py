@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Smoke tests: the modules import and configuration loads
+"""
+import sys
+import os
+
+import pytest
+
+# Make the repository root importable so src is a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import load_config, Config
+from src.telegram_bridge import TelegramBridge
+
+def test_imports():
+    """Test that config and the bridge can be created."""
+    config = Config()
+    assert config.tg_max_chunk > 0
+
+    bridge = TelegramBridge(bot_token="test", chat_id=12345)
+    assert bridge.chat_id == 12345
+
+def test_malformed_allowed_user_ids_are_rejected(monkeypatch):
+    """A non-numeric entry in ALLOWED_USER_IDS fails loudly instead of being ignored."""
+    monkeypatch.setenv('ALLOWED_USER_IDS', '42,abc')
+    with pytest.raises(ValueError):
+        Config.from_env()
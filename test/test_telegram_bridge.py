@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the Telegram bridge: authorization, sending and chunking
+"""
+import asyncio
+import sys
+import os
+
+# Make the repository root importable so src is a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.config import Config
+from src import telegram_bridge
+from src.telegram_bridge import TelegramBridge
+
+def test_is_authorized_uses_frozenset(monkeypatch):
+    """Allowed user IDs are parsed once into a frozenset and checked by membership."""
+    monkeypatch.setenv('ALLOWED_USER_IDS', '42, 7,')
+    config = Config.from_env()
+    assert config.allowed_user_ids == frozenset({42, 7})
+
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, allowed_user_ids=config.allowed_user_ids)
+    assert isinstance(bridge.allowed_user_ids, frozenset)
+    assert bridge.is_authorized(42)
+    assert not bridge.is_authorized(43)
+    assert not bridge.is_authorized(None)
+
+    # No allow list means everyone in the chat may send commands
+    assert TelegramBridge(bot_token="test", chat_id=12345).is_authorized(43)
+
+def _recording_bridge(max_chunk=20, reply=lambda chunk: (200, {}), delay=0):
+    """Return a bridge whose sends are recorded instead of posted, and the record.
+
+    reply maps each chunk to the (status, body) Telegram answers with.
+    """
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, max_chunk=max_chunk, send_interval_ms=0)
+    sent = []
+
+    async def fake_send_chunk(chunk):
+        await asyncio.sleep(delay)
+        sent.append(chunk)
+        return reply(chunk)
+
+    bridge._send_chunk = fake_send_chunk
+    return bridge, sent
+
+def test_send_message_batches_in_order():
+    """Queued messages are joined in order and never merged past max_chunk."""
+    bridge, sent = _recording_bridge()
+
+    async def run():
+        for text in ['a', 'b', 'c', 'x' * 15, 'd']:
+            await bridge.send_message(text)
+        await bridge.close()
+
+    asyncio.run(run())
+    assert sent == ['a\nb\nc', 'x' * 15 + '\nd']
+
+def test_send_message_keeps_oversized_chunks_separate():
+    """A message over max_chunk is sent as its own chunks between its neighbours' batches."""
+    bridge, sent = _recording_bridge(max_chunk=10)
+
+    async def run():
+        for text in ['a', 'b', 'one two three four', 'c']:
+            await bridge.send_message(text)
+        await bridge.close()
+
+    asyncio.run(run())
+    assert sent == ['a\nb', 'one two', 'three four', 'c']
+
+def test_send_message_resends_unparseable_batch_one_by_one():
+    """If Telegram can't parse a batch, its messages are retried individually."""
+    unparseable = (400, {'description': "Bad Request: can't parse entities"})
+    bridge, sent = _recording_bridge(
+        reply=lambda chunk: unparseable if '\n' in chunk or chunk == 'bad' else (200, {})
+    )
+
+    async def run():
+        for text in ['a', 'bad', 'c']:
+            await bridge.send_message(text)
+        await bridge.close()
+
+    asyncio.run(run())
+    assert sent == ['a\nbad\nc', 'a', 'bad', 'c']
+
+def test_send_message_retries_throttled_batch_whole_once():
+    """A 429 retries the whole batch once after retry_after instead of splitting it."""
+    throttled = (429, {'parameters': {'retry_after': 0}})
+    bridge, sent = _recording_bridge(reply=lambda chunk: throttled)
+
+    async def run():
+        for text in ['a', 'b']:
+            await bridge.send_message(text)
+        await bridge.close()
+
+    asyncio.run(run())
+    assert sent == ['a\nb', 'a\nb']
+
+def test_send_message_drops_batch_on_network_error():
+    """A send with no response is neither split nor resent, so nothing is duplicated."""
+    bridge, sent = _recording_bridge(reply=lambda chunk: (0, {}))
+
+    async def run():
+        for text in ['a', 'b']:
+            await bridge.send_message(text)
+        await bridge.close()
+
+    asyncio.run(run())
+    assert sent == ['a\nb']
+
+def test_send_message_queue_is_bounded(monkeypatch):
+    """send_message waits for the sender once the queue is full, and nothing is lost."""
+    monkeypatch.setattr(telegram_bridge, 'SEND_QUEUE_SIZE', 2)
+    bridge, sent = _recording_bridge(max_chunk=1, delay=0.001)
+    queued = []
+
+    async def run():
+        for i in range(10):
+            await bridge.send_message(str(i))
+            queued.append(bridge._outgoing_buffer.qsize())
+        await bridge.close()
+
+    asyncio.run(run())
+    assert max(queued) <= 2
+    assert sent == [str(i) for i in range(10)]
+
+def test_stop_mid_batch_confirms_handled_updates():
+    """Stopping while an update is handled confirms the ones before it, not it."""
+    bridge = TelegramBridge(bot_token="test", chat_id=12345)
+    updates = [{'update_id': i} for i in (1, 2, 3)]
+    confirmed = []
+
+    class FakeResponse:
+        status = 200
+
+        async def json(self):
+            return {'ok': True, 'result': updates}
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class FakeSession:
+        def get(self, url, params=None, timeout=None):
+            return FakeResponse()
+
+    async def fake_get_session():
+        return FakeSession()
+
+    async def confirm_offset(offset):
+        confirmed.append(offset)
+
+    async def run():
+        stop_event = asyncio.Event()
+
+        async def handle(update):
+            if update['update_id'] == 2:
+                stop_event.set()
+                await asyncio.sleep(10)
+
+        bridge._get_session = fake_get_session
+        bridge._confirm_offset = confirm_offset
+        bridge.handle_incoming_message = handle
+        await asyncio.wait_for(bridge.start_polling(stop_event), timeout=5)
+
+    asyncio.run(run())
+    assert confirmed == [2]
+
+def test_chunk_text_prefers_line_breaks_over_spaces():
+    """A chunk ends at the last line break in the window before falling back to a space."""
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, max_chunk=12)
+    assert bridge._chunk_text("aaa bbb\nccc ddd eee") == ["aaa bbb", "ccc ddd eee"]
+    assert bridge._chunk_text("aaa bbb ccc ddd") == ["aaa bbb ccc", "ddd"]
+
+def test_chunk_text_skips_leading_whitespace():
+    """Whitespace at a split point is dropped instead of starting the next chunk."""
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, max_chunk=5)
+    assert bridge._chunk_text("aaaa   \n  bbbb") == ["aaaa", "bbbb"]
+
+def test_chunk_text_respects_max_chunk():
+    """No chunk is longer than max_chunk and no words are lost."""
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, max_chunk=16)
+    text = "\n".join(" ".join(f"word{i}{j}" for j in range(i % 5 + 1)) for i in range(50))
+    chunks = bridge._chunk_text(text)
+    assert all(len(chunk) <= 16 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_chunk_text_without_break_points():
+    """Text with no spaces or line breaks is cut at exactly max_chunk."""
+    bridge = TelegramBridge(bot_token="test", chat_id=12345, max_chunk=10)
+    assert bridge._chunk_text("x" * 25) == ["x" * 10, "x" * 10, "x" * 5]